@@ -1,22 +1,47 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, Header, Depends
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from typing import Optional, List, Tuple, Dict
 from pydantic import BaseModel, Field
+import anyio
+import asyncio
+import hashlib
+import io
+import mmap
+import operator
+import signal
 import subprocess
 import os
 import uuid
 import shutil
-import json
+import stat
+import tempfile
+import orjson
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
+
+# UNO 브리지 (python3-uno 가 설치된 경우에만 상주 LibreOffice 사용)
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:
+    uno = None
 
 app = FastAPI(
     title="PPT Converter API",
     description="LibreOffice를 사용한 PPT 변환 API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS 설정 (HTML에서 API 호출을 위해)
@@ -28,6 +53,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """오류 응답도 orjson 으로 직렬화 (FastAPI 기본 핸들러와 동일한 형태)"""
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=headers)
+    return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
+
+
 # 업로드 및 변환 디렉토리 설정
 UPLOAD_DIR = Path("/tmp/uploads")
 OUTPUT_DIR = Path("/tmp/outputs")
@@ -36,8 +71,174 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
 METADATA_DIR.mkdir(exist_ok=True)
 
+# 업로드 임시 파일은 가능하면 RAM 기반 tmpfs(/dev/shm)에 저장하여 디스크 쓰기/읽기를 생략
+# (쓸 수 없거나 파일이 크면 UPLOAD_DIR 사용)
+SHM_UPLOAD_DIR = Path("/dev/shm/ppt_uploads")
+SHM_UPLOAD_MAX_SIZE = 32 * 1024 * 1024
+# sendfile 을 쓸 수 없을 때 업로드 복사 버퍼 크기 (기본 64KiB 대신 큰 버퍼로 시스템 콜 감소)
+UPLOAD_COPY_BUFFER_SIZE = 4 * 1024 * 1024
+try:
+    SHM_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    SHM_UPLOAD_AVAILABLE = os.access(SHM_UPLOAD_DIR, os.W_OK)
+except OSError:
+    SHM_UPLOAD_AVAILABLE = False
+
+# 경로 탐색 검사용 (요청마다 resolve 하지 않도록 미리 계산)
+OUTPUT_DIR_RESOLVED = OUTPUT_DIR.resolve()
+
+# 다운로드 응답 캐시 헤더 (출력 파일명은 UUID 기반이라 내용이 바뀌지 않음)
+DOWNLOAD_CACHE_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
 # 한국 시간대
-KST = pytz.timezone('Asia/Seoul')
+KST = ZoneInfo('Asia/Seoul')
+
+
+
+class ShardedLRU:
+    """샤드별 잠금을 가진 크기 제한 LRU 캐시
+
+    키 해시로 샤드를 고르고, 샤드마다 최대 항목 수를 넘으면 가장 오래 사용하지 않은
+    항목부터 제거한다.
+    """
+
+    NUM_SHARDS = 16
+
+    def __init__(self, max_size: int):
+        self.max_per_shard = max(1, max_size // self.NUM_SHARDS)
+        self._shards = [OrderedDict() for _ in range(self.NUM_SHARDS)]
+        self._locks = [threading.Lock() for _ in range(self.NUM_SHARDS)]
+        self._hits = [0] * self.NUM_SHARDS
+        self._misses = [0] * self.NUM_SHARDS
+        # 샤드 잠금 안에서만 갱신하도록 샤드별로 집계
+        self._evictions = [0] * self.NUM_SHARDS
+
+    def _shard_index(self, key) -> int:
+        return hash(key) & (self.NUM_SHARDS - 1)
+
+    def get(self, key, default=None):
+        index = self._shard_index(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            if key in shard:
+                shard.move_to_end(key)
+                self._hits[index] += 1
+                return shard[key]
+            self._misses[index] += 1
+            return default
+
+    def __setitem__(self, key, value) -> None:
+        index = self._shard_index(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            shard[key] = value
+            shard.move_to_end(key)
+            while len(shard) > self.max_per_shard:
+                shard.popitem(last=False)
+                self._evictions[index] += 1
+
+    def pop(self, key, default=None):
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return self._shards[index].pop(key, default)
+
+    def items(self) -> List[tuple]:
+        result = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                result.extend(shard.items())
+        return result
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    @property
+    def evictions(self) -> int:
+        return sum(self._evictions)
+
+    def stats(self) -> dict:
+        """샤드별 적중/미스 통계"""
+        return {
+            "size": len(self),
+            "max_size": self.max_per_shard * self.NUM_SHARDS,
+            "hits": sum(self._hits),
+            "misses": sum(self._misses),
+            "evictions": self.evictions,
+            "shards": [
+                {"size": len(shard), "hits": hits, "misses": misses, "evictions": evictions}
+                for shard, hits, misses, evictions in zip(self._shards, self._hits, self._misses, self._evictions)
+            ]
+        }
+
+
+# 메타데이터 인덱스 (출력 파일명 / 파일 ID 기준)
+# 최초 조회 시 디스크에서 한 번 적재하고, 이후에는 변환/삭제 시 갱신한다.
+# 장시간 실행 시 메모리가 계속 늘지 않도록 크기를 제한하며, 밀려난 항목은 디스크에서 다시 읽는다.
+METADATA_CACHE_SIZE = int(os.environ.get("METADATA_CACHE_SIZE", "10000"))
+_BY_OUTPUT = ShardedLRU(METADATA_CACHE_SIZE)
+_BY_ID = ShardedLRU(METADATA_CACHE_SIZE)
+# 디스크에도 메타데이터가 없는 출력 파일명 (캐시에서 밀려난 뒤 /outputs 마다 디스크를 다시 읽지 않도록)
+_NO_METADATA = ShardedLRU(METADATA_CACHE_SIZE)
+
+# 같은 내용/옵션의 재변환 방지 캐시 ((내용 해시, 출력 형식, 옵션, 폰트 구성) -> 출력 파일명)
+# 메타데이터의 content_hash, font_set 으로부터 복원되므로 재시작 후에도 유지된다.
+CONVERSION_CACHE_SIZE = int(os.environ.get("CONVERSION_CACHE_SIZE", "10000"))
+_CONVERSION_CACHE = ShardedLRU(CONVERSION_CACHE_SIZE)
+_LOADED = False
+METADATA_LOAD_WORKERS = 8
+_METADATA_LOCK = threading.Lock()
+
+# /outputs 수정 시각 문자열 캐시 ((파일명, mtime_ns) -> (ISO 문자열, 표시용 문자열))
+_TIME_FMT_CACHE: Dict[Tuple[str, int], Tuple[str, str]] = {}
+_TIME_FMT_LOCK = threading.Lock()
+
+# 동시에 실행할 LibreOffice 변환 수 (초과 요청은 대기)
+# 환경 변수 CONVERT_CONCURRENCY 로 조정 가능하며 CPU 수를 넘지 않음
+CONVERT_CONCURRENCY = max(1, min(
+    os.cpu_count() or 1,
+    int(os.environ.get("CONVERT_CONCURRENCY", max(1, (os.cpu_count() or 1) // 2)))
+))
+CONVERT_SEMAPHORE = asyncio.Semaphore(CONVERT_CONCURRENCY)
+
+# 상주 LibreOffice (UNO) 워커 설정
+# 워커마다 전용 UserInstallation 과 파이프(UNIX 소켓)를 사용하여 서로/CLI 변환과 겹치지 않게 함
+UNO_PROFILE_ROOT = Path("/tmp/lo-uno-profiles")
+UNO_WORKER_COUNT = CONVERT_CONCURRENCY
+_OFFICE_WORKERS: List["OfficeWorker"] = []
+_IDLE_OFFICE_WORKERS: Optional[asyncio.Queue] = None
+
+# CLI 변환 배치 설정 (UNO 를 쓸 수 없을 때 짧은 시간 안에 들어온 요청을 soffice 한 번으로 처리)
+CLI_BATCH_WINDOW = 0.1  # 초
+CLI_BATCH_MAX_SIZE = 8
+# CLI 변환 명령어의 고정 부분 (요청마다 다시 만들지 않음)
+_BASE_CMD = ("libreoffice", "--headless")
+# 동시에 실행되는 CLI 변환이 같은 프로필을 쓰지 않도록 변환 슬롯마다 UserInstallation 을 따로 둠
+CLI_PROFILE_ROOT = Path("/tmp/lo-cli-profiles")
+_CLI_PROFILE_SLOTS: Optional[asyncio.Queue] = None
+
+# 시작 시 LibreOffice 초기화(프로필, 폰트 캐시 등)용 1쪽짜리 문서
+WARMUP_FILE = Path(__file__).parent / "warmup.fodp"
+WARMUP_TIMEOUT = 30  # 초 (재시도 포함 전체 예열 제한 시간)
+_WARMUP_TASK: Optional[asyncio.Task] = None
+
+# 출력 형식별 Impress 내보내기 필터
+IMPRESS_EXPORT_FILTERS = {
+    "pdf": "impress_pdf_Export",
+    "odp": "impress8",
+    "pptx": "Impress MS PowerPoint 2007 XML",
+    "html": "impress_html_Export"
+}
+
+# 백그라운드 메타데이터 기록 작업 (경로 -> 작업, 삭제/종료 시 완료 대기)
+_PENDING_WRITES: Dict[Path, asyncio.Task] = {}
+
+# /health, /fonts 의 외부 명령 결과 캐시 (키 -> (저장 시각, 값)), 유지 시간(초)
+PROBE_CACHE_TTL = 60
+FONT_CACHE_TTL = 300
+_PROBE_CACHE: Dict[str, Tuple[float, object]] = {}
+# /fonts 응답 본문 캐시 (폰트 목록, 직렬화된 JSON)
+_FONTS_JSON_CACHE: Optional[Tuple[Tuple[str, ...], bytes]] = None
+# 폰트 구성 식별자 캐시 (폰트 목록, 해시) - 재변환 방지 캐시 키에 포함
+_FONT_SET_CACHE: Optional[Tuple[Tuple[str, ...], str]] = None
 
 
 # 변환 옵션 모델
@@ -108,59 +309,922 @@ PDF_QUALITY_PRESETS = {
 }
 
 
-def load_metadata_index() -> Tuple[Dict[str, dict], Dict[str, dict]]:
-    """메타데이터를 출력 파일명/파일 ID 기준으로 캐시"""
-    metadata_by_output: Dict[str, dict] = {}
-    metadata_by_id: Dict[str, dict] = {}
+def _index_metadata(metadata: dict, fallback_name: str) -> None:
+    """메타데이터를 인덱스에 추가 (호출 측에서 잠금 보유)"""
+    output_name = metadata.get("output_filename") or fallback_name
+    if output_name:
+        _BY_OUTPUT[output_name] = metadata
+        _NO_METADATA.pop(output_name)
 
-    if not METADATA_DIR.exists():
-        return metadata_by_output, metadata_by_id
+    file_id = metadata.get("file_id")
+    if file_id:
+        _BY_ID[file_id] = metadata
 
-    for metadata_path in METADATA_DIR.glob("*.json"):
-        try:
-            with open(metadata_path, "r", encoding="utf-8") as metadata_fp:
-                metadata = json.load(metadata_fp)
-        except Exception:
-            continue
+    cache_key = _metadata_cache_key(metadata)
+    if cache_key and output_name:
+        _CONVERSION_CACHE[cache_key] = output_name
 
-        output_name = metadata.get("output_filename") or metadata_path.stem
-        if output_name:
-            metadata_by_output[output_name] = metadata
 
-        file_id = metadata.get("file_id")
-        if file_id:
-            metadata_by_id[file_id] = metadata
+def conversion_cache_key(content_hash: str, output_format: str, conversion_options: dict, font_set: str) -> tuple:
+    """변환 결과 재사용 캐시 키 (폰트 구성이 바뀌면 이전 결과를 재사용하지 않음)"""
+    return (content_hash, output_format, tuple(sorted(conversion_options.items())), font_set)
 
-    return metadata_by_output, metadata_by_id
 
+def _metadata_cache_key(metadata: dict) -> Optional[tuple]:
+    """메타데이터에 저장된 해시/옵션/폰트 구성으로 캐시 키 복원 (하나라도 없으면 None)"""
+    content_hash = metadata.get("content_hash")
+    output_format = metadata.get("output_format")
+    font_set = metadata.get("font_set")
+    if not content_hash or not output_format or not font_set:
+        return None
+    return conversion_cache_key(content_hash, output_format, metadata.get("conversion_options") or {}, font_set)
 
-def delete_metadata_for_output(filename: str) -> bool:
-    """출력 파일에 해당하는 메타데이터 삭제"""
-    deleted = False
 
-    # 1) 출력 파일명 기반 메타데이터
-    metadata_path = METADATA_DIR / f"{filename}.json"
-    if metadata_path.exists():
-        metadata_path.unlink()
+def find_cached_conversion(cache_key: tuple) -> Optional[Tuple[Path, os.stat_result]]:
+    """같은 내용/옵션으로 이미 변환된 출력 파일 조회 (파일이 지워졌으면 None)
+
+    재사용 시 새 메타데이터를 만들지 않으므로 /outputs 에는 처음 업로드한 파일명이 표시된다.
+    """
+    load_metadata_index()
+    output_name = _CONVERSION_CACHE.get(cache_key)
+    if output_name is None:
+        return None
+
+    output_path = OUTPUT_DIR / output_name
+    try:
+        output_stat = output_path.stat()
+    except OSError:
+        _CONVERSION_CACHE.pop(cache_key)
+        return None
+    return output_path, output_stat
+
+
+def scan_files(directory: Path) -> List[os.DirEntry]:
+    """디렉토리의 일반 파일 DirEntry 목록 (디렉토리가 없으면 빈 목록)
+
+    exists() 로 먼저 확인하지 않고 scandir 한 번으로 처리한다.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return [entry for entry in entries if entry.is_file(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+
+def _read_metadata_file(metadata_path) -> dict:
+    """메타데이터 JSON 을 mmap 으로 매핑해 중간 버퍼 없이 파싱"""
+    with open(metadata_path, "rb") as metadata_fp:
+        if os.fstat(metadata_fp.fileno()).st_size == 0:
+            raise ValueError(f"빈 메타데이터 파일: {metadata_path}")
+        with mmap.mmap(metadata_fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return orjson.loads(view)
+
+
+def _load_one_metadata(metadata_path: str) -> Optional[dict]:
+    """메타데이터 파일 하나 적재 (읽을 수 없으면 None)"""
+    try:
+        return _read_metadata_file(metadata_path)
+    except Exception:
+        return None
+
+
+def _migrate_legacy_metadata(metadata_path: str, metadata: dict) -> bool:
+    """file_id 기준 레거시 메타데이터 파일을 {출력 파일명}.json 으로 이름 변경
+
+    이미 출력 파일명 기준 파일이 있으면 그쪽을 유지하고 레거시 파일은 지운다.
+    레거시 내용을 버린 경우 False (인덱스에 넣지 않음).
+    """
+    output_name = metadata.get("output_filename")
+    if not output_name or os.path.basename(metadata_path) == f"{output_name}.json":
         return True
 
-    # 2) file_id 기반 레거시 메타데이터
+    target = METADATA_DIR / f"{output_name}.json"
+    try:
+        if target.exists():
+            os.unlink(metadata_path)
+            return False
+        os.rename(metadata_path, target)
+    except OSError:
+        pass
+    return True
+
+
+def load_metadata_index() -> Tuple[ShardedLRU, ShardedLRU]:
+    """메타데이터를 출력 파일명/파일 ID 기준으로 캐시
+
+    최초 호출 시에만 METADATA_DIR 을 읽고(레거시 파일명은 이때 정리), 이후에는
+    메모리 인덱스를 그대로 반환한다.
+    """
+    global _LOADED
+
+    # 적재 이후에는 잠금 없이 인덱스만 반환 (/outputs 에서 파일마다 호출됨)
+    if _LOADED:
+        return _BY_OUTPUT, _BY_ID
+
+    with _METADATA_LOCK:
+        if not _LOADED:
+            # 적재 전에 추가된 항목은 아직 디스크 기록 전일 수 있으므로 디스크 내용보다 우선
+            pending = list(_BY_OUTPUT.items())
+
+            paths = [entry.path for entry in scan_files(METADATA_DIR) if entry.name.endswith(".json")]
+
+            # 디스크 읽기와 파싱이 겹치도록 여러 스레드에서 동시에 적재
+            with ThreadPoolExecutor(max_workers=METADATA_LOAD_WORKERS) as pool:
+                for path, metadata in zip(paths, pool.map(_load_one_metadata, paths)):
+                    if metadata is not None and _migrate_legacy_metadata(path, metadata):
+                        _index_metadata(metadata, os.path.basename(path)[:-len(".json")])
+
+            for output_name, metadata in pending:
+                _index_metadata(metadata, output_name)
+            _LOADED = True
+
+    return _BY_OUTPUT, _BY_ID
+
+
+def get_metadata_for_output(filename: str) -> Optional[dict]:
+    """출력 파일명에 해당하는 메타데이터 조회 (캐시에서 밀려난 경우 디스크에서 다시 읽음)"""
     metadata_by_output, metadata_by_id = load_metadata_index()
-    metadata = metadata_by_output.get(filename)
-    if metadata:
-        file_id = metadata.get("file_id")
-        if file_id:
-            legacy_metadata = METADATA_DIR / f"{file_id}.json"
-            if legacy_metadata.exists():
-                legacy_metadata.unlink()
-                deleted = True
+    file_id = os.path.splitext(filename)[0]
+    metadata = metadata_by_output.get(filename) or metadata_by_id.get(file_id)
+    if metadata is not None or not (_BY_OUTPUT.evictions or _BY_ID.evictions):
+        return metadata
+    if _NO_METADATA.get(filename):
+        return None
+
+    metadata_path = METADATA_DIR / f"{filename}.json"
+    try:
+        metadata = _read_metadata_file(metadata_path)
+    except Exception:
+        with _METADATA_LOCK:
+            # 읽는 사이 새로 저장된 경우에는 기록하지 않음
+            if _BY_OUTPUT.get(filename) is None:
+                _NO_METADATA[filename] = True
+        return None
+    with _METADATA_LOCK:
+        _index_metadata(metadata, metadata_path.stem)
+    return metadata
+
+
+def cache_metadata(metadata_path: Path, metadata: dict) -> None:
+    """방금 저장한 메타데이터를 인덱스에 반영"""
+    with _METADATA_LOCK:
+        _index_metadata(metadata, metadata_path.stem)
+
+
+def uncache_metadata(filename: str) -> None:
+    """삭제된 출력 파일의 메타데이터를 인덱스에서 제거"""
+    with _METADATA_LOCK:
+        metadata = _BY_OUTPUT.pop(filename, None)
+        file_id = metadata.get("file_id") if metadata else None
+        if file_id and _BY_ID.get(file_id) is metadata:
+            _BY_ID.pop(file_id)
+
+        cache_key = _metadata_cache_key(metadata) if metadata else None
+        if cache_key and _CONVERSION_CACHE.get(cache_key) == filename:
+            _CONVERSION_CACHE.pop(cache_key)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """임시 파일에 기록 후 교체하여 부분 기록된 파일이 남지 않도록 저장
+
+    교체 전에 fsync 하여 전원이 꺼져도 빈 파일/일부만 쓰인 파일로 바뀌지 않게 한다.
+    """
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "wb") as tmp_fp:
+        tmp_fp.write(data)
+        tmp_fp.flush()
+        os.fsync(tmp_fp.fileno())
+    os.replace(tmp_path, path)
+
+
+async def _write_metadata_async(path: Path, data: bytes) -> None:
+    """메타데이터 파일 기록을 스레드풀에서 실행"""
+    await run_in_threadpool(_atomic_write, path, data)
+
+
+def save_metadata(metadata_path: Path, metadata: dict) -> None:
+    """메타데이터를 인덱스에 즉시 반영하고 디스크 기록은 백그라운드로 처리"""
+    payload = orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    cache_metadata(metadata_path, metadata)
+
+    task = asyncio.create_task(_write_metadata_async(metadata_path, payload))
+    _PENDING_WRITES[metadata_path] = task
+
+    def _forget(done: asyncio.Task) -> None:
+        if _PENDING_WRITES.get(metadata_path) is done:
+            del _PENDING_WRITES[metadata_path]
+
+    task.add_done_callback(_forget)
 
+
+def _unlink_if_exists(path: Path) -> bool:
+    """파일 삭제 (없으면 False, stat 없이 unlink 한 번으로 처리)"""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+async def delete_metadata_for_output(filename: str) -> bool:
+    """출력 파일에 해당하는 메타데이터 삭제 (레거시 파일명은 적재 시 정리되므로 한 곳만 확인)
+
+    아직 기록 중인 메타데이터가 있으면 기록이 끝난 뒤 지워 고아 파일이 남지 않게 한다.
+    """
+    load_metadata_index()
+    metadata_path = METADATA_DIR / f"{filename}.json"
+    pending = _PENDING_WRITES.get(metadata_path)
+    if pending is not None:
+        await asyncio.gather(pending, return_exceptions=True)
+    deleted = _unlink_if_exists(metadata_path)
+    uncache_metadata(filename)
     return deleted
 
+
+async def run_command(
+    cmd: List[str],
+    timeout: float,
+    capture_stdout: bool = True,
+    text: bool = True
+) -> subprocess.CompletedProcess:
+    """외부 명령을 이벤트 루프를 막지 않고 실행 (subprocess.run 과 같은 결과/예외 형태)
+
+    capture_stdout=False 면 stdout 을 버리고, text=False 면 출력을 bytes 그대로 돌려준다.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE if capture_stdout else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    if text:
+        stdout = stdout.decode("utf-8", errors="replace") if stdout is not None else None
+        stderr = stderr.decode("utf-8", errors="replace")
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def hash_upload(upload_fp) -> str:
+    """업로드 내용 해시 (blake2b 128bit, 스레드풀에서 실행, 읽은 뒤 위치 복원)"""
+    digest = hashlib.blake2b(digest_size=16)
+    start = upload_fp.tell()
+    for chunk in iter(lambda: upload_fp.read(UPLOAD_COPY_BUFFER_SIZE), b""):
+        digest.update(chunk)
+    upload_fp.seek(start)
+    return digest.hexdigest()
+
+
+def _upload_fileno(upload_fp) -> Optional[int]:
+    """업로드 파일의 fd 반환 (디스크에 없는 경우 None)"""
+    # 메모리에만 있는 SpooledTemporaryFile 은 fileno() 호출 시 디스크로 옮겨지므로 제외
+    if isinstance(upload_fp, tempfile.SpooledTemporaryFile) and not upload_fp._rolled:
+        return None
+    try:
+        return upload_fp.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def save_upload(upload_fp, destination: Path) -> None:
+    """업로드 파일을 디스크에 저장 (스레드풀에서 실행)
+
+    업로드가 이미 임시 파일로 넘어가 있으면 os.sendfile 로 커널 안에서 복사한다.
+    """
+    with open(destination, "wb") as f:
+        in_fd = _upload_fileno(upload_fp)
+        if in_fd is not None:
+            try:
+                upload_fp.flush()
+                offset = upload_fp.tell()
+                remaining = os.fstat(in_fd).st_size - offset
+                while remaining > 0:
+                    sent = os.sendfile(f.fileno(), in_fd, offset, remaining)
+                    if sent == 0:
+                        break
+                    offset += sent
+                    remaining -= sent
+                return
+            except OSError:
+                # sendfile 미지원 파일시스템 등: 처음부터 일반 복사로 재시도
+                f.seek(0)
+                f.truncate()
+                upload_fp.seek(0)
+
+        shutil.copyfileobj(upload_fp, f, length=UPLOAD_COPY_BUFFER_SIZE)
+
+
+def _uno_property(name: str, value) -> "PropertyValue":
+    """UNO PropertyValue 생성"""
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def _parse_filter_value(value: str):
+    """"키=값" 필터 옵션의 값을 UNO 타입으로 변환"""
+    if value in ("true", "false"):
+        return value == "true"
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _connect_uno(connection: str):
+    """상주 LibreOffice 에 연결하여 Desktop 객체 반환"""
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_context
+    )
+    context = resolver.resolve(f"uno:{connection};urp;StarOffice.ComponentContext")
+    return context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+
+class OfficeWorker:
+    """상주 LibreOffice 프로세스 하나 (전용 프로필 + 파이프 연결)
+
+    soffice 는 실제 office 프로세스(soffice.bin)를 자식으로 띄우는 실행기이므로 새 세션으로
+    실행하고, 종료할 때는 프로세스 그룹 전체에 시그널을 보낸다.
+    """
+
+    def __init__(self, index: int, generation: int = 0):
+        self.index = index
+        self.generation = generation
+        # 교체된 워커가 이전 프로세스의 파이프와 겹치지 않도록 세대 번호를 붙임
+        self.connection = f"pipe,name=ppt_converter_office_{index}_{generation}"
+        self.profile_dir = UNO_PROFILE_ROOT / f"worker-{index}"
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._desktop = None
+        self._lock = threading.Lock()
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        """soffice 실행 (실행 파일이 없으면 워커를 사용하지 않음)"""
+        self._desktop = None
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                "soffice",
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--nodefault",
+                "--norestore",
+                "--nofirststartupwizard",
+                f"-env:UserInstallation={self.profile_dir.as_uri()}",
+                f"--accept={self.connection};urp;StarOffice.ServiceManager",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True
+            )
+        except OSError:
+            self.process = None
+
+    def _signal_group(self, sig: int) -> None:
+        """soffice 와 자식 soffice.bin 에 시그널 전송 (이미 종료되었으면 무시)"""
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def kill(self) -> None:
+        """응답하지 않는 soffice 강제 종료"""
+        self._signal_group(signal.SIGKILL)
+
+    async def stop(self) -> None:
+        if not self.is_running():
+            self._signal_group(signal.SIGKILL)
+            return
+        self._signal_group(signal.SIGTERM)
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            pass
+        self._signal_group(signal.SIGKILL)
+
+    def convert(self, input_file: Path, output_file: Path, output_format: str, filter_options: List[str]) -> None:
+        """UNO 로 문서 변환 (스레드풀에서 실행, 실패 시 예외)"""
+        with self._lock:
+            try:
+                if self._desktop is None:
+                    self._desktop = _connect_uno(self.connection)
+
+                document = self._desktop.loadComponentFromURL(
+                    uno.systemPathToFileUrl(str(input_file)), "_blank", 0,
+                    (_uno_property("Hidden", True),)
+                )
+                if document is None:
+                    raise RuntimeError("문서를 열 수 없습니다.")
+
+                try:
+                    store_props = [_uno_property("FilterName", IMPRESS_EXPORT_FILTERS[output_format])]
+                    if filter_options:
+                        filter_data = tuple(
+                            _uno_property(key, _parse_filter_value(value))
+                            for key, value in (option.split("=", 1) for option in filter_options)
+                        )
+                        store_props.append(_uno_property(
+                            "FilterData", uno.Any("[]com.sun.star.beans.PropertyValue", filter_data)
+                        ))
+                    uno.invoke(document, "storeToURL", (uno.systemPathToFileUrl(str(output_file)), tuple(store_props)))
+                finally:
+                    document.close(True)
+            except Exception:
+                # 연결이 끊겼을 수 있으므로 다음 요청에서 재연결
+                self._desktop = None
+                raise
+
+
+async def run_libreoffice_cli(args: List[str], timeout: float) -> subprocess.CompletedProcess:
+    """변환 슬롯과 슬롯 전용 프로필을 잡고 libreoffice CLI 실행
+
+    같은 프로필을 쓰는 libreoffice 가 이미 떠 있으면 새 프로세스는 변환 없이 끝나므로,
+    동시에 실행되는 CLI 변환은 서로 다른 UserInstallation 을 사용한다.
+    timeout 은 슬롯을 기다린 시간까지 포함한다.
+    """
+    global _CLI_PROFILE_SLOTS
+    if _CLI_PROFILE_SLOTS is None:
+        _CLI_PROFILE_SLOTS = asyncio.Queue()
+        for slot in range(CONVERT_CONCURRENCY):
+            _CLI_PROFILE_SLOTS.put_nowait(slot)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    cmd = [*_BASE_CMD, *args]
+    async with CONVERT_SEMAPHORE:
+        slot = await _CLI_PROFILE_SLOTS.get()
+        try:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            profile = (CLI_PROFILE_ROOT / f"slot-{slot}").as_uri()
+            # 출력은 실패 시에만 쓰므로 stdout 은 버리고 stderr 만 bytes 로 받음
+            return await run_command(
+                [*_BASE_CMD, f"-env:UserInstallation={profile}", *args],
+                timeout=remaining, capture_stdout=False, text=False
+            )
+        finally:
+            _CLI_PROFILE_SLOTS.put_nowait(slot)
+
+
+def make_job_dir() -> Path:
+    """OUTPUT_DIR 안의 변환 전용 임시 디렉토리 생성 (같은 파일시스템이라 결과를 rename 으로 옮길 수 있음)
+
+    점으로 시작하는 디렉토리라 /outputs 목록과 다운로드 대상에 포함되지 않는다.
+    """
+    return Path(tempfile.mkdtemp(prefix=".job-", dir=OUTPUT_DIR))
+
+
+def move_job_outputs(job_dir: Path, output_name: str, output_format: str) -> bool:
+    """작업 디렉토리의 변환 결과를 OUTPUT_DIR 로 rename (본 출력 파일을 옮겼으면 True)
+
+    html 은 슬라이드 페이지/이미지 보조 파일이 함께 생기므로 작업 디렉토리의 파일을 모두 옮기고,
+    본 출력 파일은 보조 파일이 자리 잡은 뒤 마지막에 옮긴다.
+    """
+    if output_format == "html":
+        for entry in os.scandir(job_dir):
+            if entry.name != output_name:
+                try:
+                    os.replace(entry.path, OUTPUT_DIR / entry.name)
+                except OSError:
+                    pass
+    try:
+        os.rename(job_dir / output_name, OUTPUT_DIR / output_name)
+        return True
+    except OSError:
+        return False
+
+
+def sweep_job_dirs() -> None:
+    """이전 실행이 비정상 종료하며 남긴 작업 디렉토리 정리"""
+    for entry in os.scandir(OUTPUT_DIR):
+        if entry.name.startswith(".job-") and entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _replace_office_worker(worker: OfficeWorker) -> OfficeWorker:
+    """시간 초과된 워커를 종료하고 같은 자리에 새 워커 생성
+
+    멈춘 변환 스레드가 이전 워커의 잠금을 계속 쥐고 있을 수 있으므로 재사용하지 않는다.
+    새 워커는 다음 요청에서 시작된다.
+    """
+    worker.kill()
+    fresh = OfficeWorker(worker.index, worker.generation + 1)
+    _OFFICE_WORKERS[_OFFICE_WORKERS.index(worker)] = fresh
+    return fresh
+
+
+class ConversionBatcher:
+    """같은 변환 형식의 CLI 변환 요청을 모아 libreoffice 한 번의 실행으로 처리
+
+    첫 요청 이후 CLI_BATCH_WINDOW 동안(최대 CLI_BATCH_MAX_SIZE 개) 들어온 요청을 묶어
+    LibreOffice 기동 비용을 나눠 낸다. 배치마다 전용 작업 디렉토리에 변환한 뒤
+    결과를 OUTPUT_DIR 로 rename 하고, rename 성공 여부로 요청별 성공을 판단한다.
+    요청마다 제출 시각 + timeout 을 마감 시각으로 두며, 배치/재변환 모두 이를 넘기지 않는다.
+    """
+
+    def __init__(self):
+        self._queues: Dict[Tuple[str, str, float], asyncio.Queue] = {}
+        self._tasks: Dict[Tuple[str, str, float], asyncio.Task] = {}
+        self._retries: set = set()
+
+    async def submit(self, input_file: Path, convert_format: str, output_format: str, timeout: float) -> subprocess.CompletedProcess:
+        key = (convert_format, output_format, timeout)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+
+        # 배치 작업이 예기치 않게 끝났으면 다시 시작 (큐에 쌓인 요청이 영원히 대기하지 않도록)
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            self._tasks[key] = asyncio.create_task(self._run(key, queue))
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = (input_file, future, loop.time() + timeout)
+        if output_format == "html":
+            # html 보조 파일은 문서마다 같은 이름(img0.html 등)으로 생기므로 묶지 않고
+            # 요청마다 전용 작업 디렉토리에서 단독 실행
+            await self._convert_batch([job], convert_format, output_format)
+        else:
+            await queue.put(job)
+        return await future
+
+    async def _run(self, key: Tuple[str, str, float], queue: asyncio.Queue) -> None:
+        convert_format, output_format, _ = key
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + CLI_BATCH_WINDOW
+            while len(batch) < CLI_BATCH_MAX_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._convert_batch(batch, convert_format, output_format)
+            except Exception as e:
+                # 작업 디렉토리 생성 실패 등: 이 배치의 요청에 오류를 전달하고 다음 배치를 계속 처리
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _run_libreoffice(
+        self, input_files: List[Path], convert_format: str, output_format: str, timeout: float
+    ) -> Tuple[subprocess.CompletedProcess, set]:
+        """libreoffice 한 번 실행 후 결과를 OUTPUT_DIR 로 옮김 (옮긴 입력 파일 집합 반환)"""
+        # 배치 전용 작업 디렉토리 (변환 중인 파일이 /outputs 목록에 보이지 않도록)
+        job_dir = make_job_dir()
+        try:
+            result = await run_libreoffice_cli(
+                ["--convert-to", convert_format, "--outdir", str(job_dir), *(str(f) for f in input_files)],
+                timeout=timeout
+            )
+
+            converted = set()
+            for input_file in input_files:
+                if move_job_outputs(job_dir, f"{input_file.stem}.{output_format}", output_format):
+                    converted.add(input_file)
+            return result, converted
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    async def _convert_batch(
+        self, batch: List[Tuple[Path, asyncio.Future, float]], convert_format: str, output_format: str
+    ) -> None:
+        """배치 변환 (배치가 실패/시간 초과하면 출력이 없는 요청만 따로 다시 변환)
+
+        여러 요청을 묶은 실행은 가장 이른 마감까지 남은 시간의 절반만 쓰고, 실패하면
+        나머지 시간 안에서 요청마다 별도 작업으로 동시에 재변환한다. 손상되거나 멈추는 문서
+        하나가 같은 배치의 다른 요청을 실패시키거나 각 요청의 제한 시간을 늘리지 않는다.
+        """
+        loop = asyncio.get_running_loop()
+        batch = [job for job in batch if not job[1].done()]
+        if not batch:
+            return
+        input_files = [input_file for input_file, _, _ in batch]
+        remaining = min(deadline for _, _, deadline in batch) - loop.time()
+
+        if len(batch) == 1:
+            input_file, future, _ = batch[0]
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired([*_BASE_CMD, str(input_file)], 0)
+            result, converted = await self._run_libreoffice(input_files, convert_format, output_format, remaining)
+            future.set_result(subprocess.CompletedProcess(
+                result.args, 0 if converted else (result.returncode or 1), result.stdout, result.stderr
+            ))
+            return
+
+        try:
+            result, converted = await self._run_libreoffice(input_files, convert_format, output_format, remaining / 2)
+        except Exception:
+            # 시간 초과로 강제 종료된 경우 남은 출력이 온전한지 알 수 없으므로 모두 다시 변환
+            result, converted = None, set()
+
+        for job in batch:
+            input_file, future, _ = job
+            if future.done():
+                continue
+            if input_file in converted:
+                future.set_result(subprocess.CompletedProcess(result.args, 0, result.stdout, result.stderr))
+            elif result is not None and result.returncode == 0:
+                # 정상 종료했는데 출력이 없으면 해당 문서만의 실패
+                future.set_result(subprocess.CompletedProcess(result.args, 1, result.stdout, result.stderr))
+            else:
+                # 앞선 재변환이나 다음 배치를 기다리지 않도록 별도 작업으로 실행
+                task = asyncio.create_task(self._retry(job, convert_format, output_format))
+                self._retries.add(task)
+                task.add_done_callback(self._retries.discard)
+
+    async def _retry(self, job: Tuple[Path, asyncio.Future, float], convert_format: str, output_format: str) -> None:
+        future = job[1]
+        try:
+            await self._convert_batch([job], convert_format, output_format)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    async def close(self) -> None:
+        tasks = [*self._tasks.values(), *self._retries]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._retries.clear()
+        self._queues.clear()
+
+
+_CLI_BATCHER = ConversionBatcher()
+
+
+async def run_conversion(
+    input_file: Path,
+    output_format: str,
+    filter_options: Optional[List[str]] = None,
+    timeout: float = 120
+) -> subprocess.CompletedProcess:
+    """문서 변환 실행
+
+    상주 LibreOffice 가 떠 있으면 UNO 로 변환하고, 사용할 수 없거나 실패하면
+    기존처럼 libreoffice --convert-to 명령으로 변환한다 (동시 요청은 배치로 묶어 실행).
+    """
+    if _IDLE_OFFICE_WORKERS is not None:
+        async with CONVERT_SEMAPHORE:
+            worker = await _IDLE_OFFICE_WORKERS.get()
+            try:
+                if not worker.is_running():
+                    await worker.start()
+                if worker.is_running():
+                    # 작업 디렉토리에 내보낸 뒤 rename (내보내는 중/실패한 파일이 /outputs 에 남지 않도록)
+                    output_name = f"{input_file.stem}.{output_format}"
+                    job_dir = None
+                    try:
+                        job_dir = make_job_dir()
+                        await asyncio.wait_for(
+                            run_in_threadpool(worker.convert, input_file, job_dir / output_name, output_format, filter_options or []),
+                            timeout=timeout
+                        )
+                        if not move_job_outputs(job_dir, output_name, output_format):
+                            raise FileNotFoundError(output_name)
+                        return subprocess.CompletedProcess(["uno", str(input_file)], 0, None, b"")
+                    except asyncio.TimeoutError:
+                        worker = _replace_office_worker(worker)
+                        raise subprocess.TimeoutExpired(["uno", str(input_file)], timeout)
+                    except Exception:
+                        pass
+                    finally:
+                        if job_dir is not None:
+                            shutil.rmtree(job_dir, ignore_errors=True)
+            finally:
+                _IDLE_OFFICE_WORKERS.put_nowait(worker)
+
+    if output_format == "pdf" and filter_options:
+        # PPT/Impress 파일은 impress_pdf_Export 필터 사용
+        filter_data = ":".join(filter_options)
+        convert_format = f"pdf:impress_pdf_Export:{{{filter_data}}}"
+    else:
+        convert_format = output_format
+
+    return await _CLI_BATCHER.submit(input_file, convert_format, output_format, timeout)
+
+
+def upload_dir_for(size: Optional[int]) -> Path:
+    """업로드 크기에 따라 임시 저장 디렉토리 선택"""
+    if not SHM_UPLOAD_AVAILABLE or size is None or size > SHM_UPLOAD_MAX_SIZE:
+        return UPLOAD_DIR
+    try:
+        shm_stat = os.statvfs(SHM_UPLOAD_DIR)
+    except OSError:
+        return UPLOAD_DIR
+    if shm_stat.f_bavail * shm_stat.f_frsize < size:
+        return UPLOAD_DIR
+    return SHM_UPLOAD_DIR
+
+
+def _safe_name(name: str) -> str:
+    """경로 구분자/상위 경로/NUL 문자가 포함된 파일명 거부"""
+    if not name or "/" in name or "\\" in name or "\x00" in name or name.startswith(".."):
+        raise HTTPException(status_code=400, detail="잘못된 파일명입니다.")
+    return name
+
+
+def _output_file(filename: str) -> Tuple[Path, os.stat_result]:
+    """OUTPUT_DIR 안의 일반 파일 경로와 stat 결과 (없으면 404, 밖을 가리키면 403)
+
+    파일명 검증으로 경로 구분자는 걸러지므로, 심볼릭 링크일 때만 resolve 로 실제 위치를 확인한다.
+    """
+    file_path = OUTPUT_DIR / _safe_name(filename)
+    try:
+        file_stat = os.lstat(file_path)
+        is_link = stat.S_ISLNK(file_stat.st_mode)
+        if is_link:
+            file_stat = file_path.stat()
+    except (OSError, ValueError):
+        file_stat = None
+    if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+
+    # 심볼릭 링크로 상위 디렉토리 밖을 가리키는 경우 방지
+    if is_link and not file_path.resolve().is_relative_to(OUTPUT_DIR_RESOLVED):
+        raise HTTPException(status_code=403, detail="접근이 거부되었습니다.")
+    return file_path, file_stat
+
+
+def _parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """단일 Range 헤더(bytes=시작-끝, bytes=시작-, bytes=-길이) 해석
+
+    형식이 맞지 않거나 여러 구간이면 None (전체 응답), 범위를 벗어나면 416.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, sep, end_text = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            start = size - int(end_text)
+            end = size - 1
+    except ValueError:
+        return None
+    start = max(start, 0)
+    if start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="요청한 범위를 만족할 수 없습니다.",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """Range 요청(단일 구간)을 지원하는 FileResponse
+
+    현재 Starlette 버전의 FileResponse 는 Range 를 처리하지 않으므로, 구간이 지정되면
+    206 과 Content-Range 를 보내고 해당 구간만 읽어 전송한다.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.headers.setdefault("accept-ranges", "bytes")
+        self.byte_range: Optional[Tuple[int, int]] = None
+
+    def set_byte_range(self, byte_range: Tuple[int, int]) -> None:
+        """전송할 구간 지정 (stat_result 를 넘겨 생성한 경우에만 사용)"""
+        start, end = byte_range
+        self.byte_range = byte_range
+        self.status_code = 206
+        self.headers["content-range"] = f"bytes {start}-{end}/{self.stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.byte_range is None:
+            await super().__call__(scope, receive, send)
+            return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            start, end = self.byte_range
+            remaining = end - start + 1
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 전송 중 파일이 줄어든 경우에도 응답은 종료
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+
+def _get_cached_probe(key: str, ttl: float = PROBE_CACHE_TTL):
+    """TTL 이 지나지 않은 캐시 값 반환 (없으면 None)"""
+    cached = _PROBE_CACHE.get(key)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+    return None
+
+
+async def _probe_libreoffice() -> bool:
+    """LibreOffice 설치 여부 확인 (TTL 캐시)"""
+    available = _get_cached_probe("libreoffice")
+    if available is not None:
+        return available
+
+    try:
+        result = await run_command(["libreoffice", "--version"], timeout=5)
+        available = result.returncode == 0
+    except Exception:
+        available = False
+
+    _PROBE_CACHE["libreoffice"] = (time.monotonic(), available)
+    return available
+
+
+async def _list_fonts() -> Optional[Tuple[str, ...]]:
+    """설치된 폰트 패밀리 목록 (TTL 캐시, fc-list 실패 시 None)"""
+    fonts = _get_cached_probe("fonts", FONT_CACHE_TTL)
+    if fonts is not None:
+        return fonts
+
+    result = await run_command(["fc-list", "--format", "%{family}\\n"], timeout=10, text=False)
+    if result.returncode != 0:
+        return None
+
+    # bytes 상태에서 중복/빈 줄을 제거하고, 남은 패밀리 이름만 디코딩해 정렬
+    families = set(result.stdout.split(b"\n"))
+    families.discard(b"")
+    fonts = tuple(sorted(f.decode("utf-8", errors="replace") for f in families))
+
+    _PROBE_CACHE["fonts"] = (time.monotonic(), fonts)
+    return fonts
+
+
+async def _font_set_id() -> Optional[str]:
+    """현재 폰트 구성 식별자 (폰트 목록이 바뀔 때만 다시 계산, 조회 실패 시 None)"""
+    global _FONT_SET_CACHE
+
+    fonts = await _list_fonts()
+    if fonts is None:
+        return None
+
+    if _FONT_SET_CACHE and _FONT_SET_CACHE[0] is fonts:
+        return _FONT_SET_CACHE[1]
+
+    digest = hashlib.sha256("\n".join(fonts).encode("utf-8")).hexdigest()[:16]
+    _FONT_SET_CACHE = (fonts, digest)
+    return digest
+
+
+async def _fonts_response_json() -> Optional[bytes]:
+    """/fonts 응답 본문 (폰트 목록이 바뀔 때만 다시 직렬화)"""
+    global _FONTS_JSON_CACHE
+
+    fonts = await _list_fonts()
+    if fonts is None:
+        return None
+
+    if _FONTS_JSON_CACHE and _FONTS_JSON_CACHE[0] is fonts:
+        return _FONTS_JSON_CACHE[1]
+
+    payload = orjson.dumps({"total_count": len(fonts), "fonts": fonts})
+    _FONTS_JSON_CACHE = (fonts, payload)
+    return payload
+
 # 허용된 입력 형식
-ALLOWED_INPUT_FORMATS = {".ppt", ".pptx", ".odp"}
+ALLOWED_INPUT_FORMATS = frozenset({".ppt", ".pptx", ".odp"})
 # 허용된 출력 형식
-ALLOWED_OUTPUT_FORMATS = {".pdf", ".odp", ".pptx", ".html"}
+ALLOWED_OUTPUT_FORMATS = frozenset({".pdf", ".odp", ".pptx", ".html"})
+# 요청 검증용 (점 없는 형식 이름, 오류 메시지) - 요청마다 만들지 않도록 미리 계산
+_ALLOWED_OUT = frozenset(fmt.lstrip(".") for fmt in ALLOWED_OUTPUT_FORMATS)
+_ALLOWED_OUT_MSG = ", ".join(sorted(_ALLOWED_OUT))
+_ALLOWED_IN_MSG = ", ".join(sorted(ALLOWED_INPUT_FORMATS))
 
 # 정적 파일 서빙 (HTML 페이지)
 static_dir = Path(__file__).parent.parent / "static"
@@ -168,6 +1232,138 @@ if static_dir.exists():
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 
+@app.on_event("startup")
+async def clean_job_dirs():
+    """비정상 종료로 남은 변환 작업 디렉토리 삭제 (다른 시작 작업보다 먼저 실행)"""
+    await run_in_threadpool(sweep_job_dirs)
+
+
+@app.on_event("startup")
+async def warm_metadata_index():
+    """첫 요청 전에 메타데이터 인덱스 적재"""
+    await run_in_threadpool(load_metadata_index)
+
+
+@app.on_event("startup")
+async def prime_probe_cache():
+    """/health, /fonts 첫 요청이 외부 명령을 기다리지 않도록 미리 조회
+
+    SIGHUP 을 받으면 캐시를 비워 다음 요청에서 다시 조회한다 (폰트 추가 후 등).
+    """
+    await asyncio.gather(_probe_libreoffice(), _list_fonts(), return_exceptions=True)
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _PROBE_CACHE.clear)
+    except (NotImplementedError, RuntimeError, AttributeError):
+        # Windows, 메인 스레드가 아닌 이벤트 루프 등 시그널 핸들러를 등록할 수 없는 환경
+        pass
+
+
+@app.on_event("startup")
+async def start_office():
+    """UNO 요청을 받을 상주 LibreOffice 워커 실행"""
+    global _IDLE_OFFICE_WORKERS
+    if uno is None:
+        return
+
+    _OFFICE_WORKERS[:] = [OfficeWorker(index) for index in range(UNO_WORKER_COUNT)]
+    await asyncio.gather(*(worker.start() for worker in _OFFICE_WORKERS))
+
+    _IDLE_OFFICE_WORKERS = asyncio.Queue()
+    for worker in _OFFICE_WORKERS:
+        _IDLE_OFFICE_WORKERS.put_nowait(worker)
+
+
+async def _warm_up_office_workers(warm_dir: Path) -> None:
+    """상주 워커마다 예열 문서 변환 (soffice 가 연결을 받을 때까지 재시도)
+
+    변환 한 번마다 남은 예열 시간을 제한 시간으로 두고, 초과하면 run_conversion 과 같이
+    워커를 강제 종료한다. 재시도 대기 중에는 변환 슬롯과 워커를 놓아 실제 요청을 막지 않는다.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WARMUP_TIMEOUT
+    warmed = 0
+    while warmed < len(_OFFICE_WORKERS):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+
+        async with CONVERT_SEMAPHORE:
+            worker = await _IDLE_OFFICE_WORKERS.get()
+            try:
+                if not worker.is_running():
+                    # 실행되지 않은 워커는 첫 요청에서 시작되므로 예열 대상에서 제외
+                    warmed += 1
+                    continue
+                await asyncio.wait_for(
+                    run_in_threadpool(worker.convert, WARMUP_FILE, warm_dir / f"{id(worker)}.pdf", "pdf", []),
+                    timeout=remaining
+                )
+                warmed += 1
+                continue
+            except asyncio.TimeoutError:
+                worker = _replace_office_worker(worker)
+                return
+            except Exception:
+                pass
+            finally:
+                _IDLE_OFFICE_WORKERS.put_nowait(worker)
+
+        await asyncio.sleep(1)
+
+
+async def warm_up_converter() -> None:
+    """예열 문서를 한 번 변환해 첫 요청의 LibreOffice 초기화 지연을 숨김
+
+    상주 워커가 있으면 워커마다, 없으면 CLI 변환 슬롯마다 변환한다. 결과는 임시 디렉토리에
+    쓰고 버리므로 /outputs 에 나타나지 않는다. 전체 예열은 WARMUP_TIMEOUT 안에서 끝난다.
+    """
+    if not WARMUP_FILE.exists():
+        return
+
+    with tempfile.TemporaryDirectory(prefix="lo-warmup-") as warm_dir:
+        try:
+            if _IDLE_OFFICE_WORKERS is not None:
+                await _warm_up_office_workers(Path(warm_dir))
+            else:
+                # 슬롯마다 프로필이 따로 있으므로 슬롯 수만큼 변환 (큐 순서대로 슬롯이 돌아감)
+                deadline = asyncio.get_running_loop().time() + WARMUP_TIMEOUT
+                for _ in range(CONVERT_CONCURRENCY):
+                    remaining = deadline - asyncio.get_running_loop().time()
+                    if remaining <= 0:
+                        break
+                    await run_libreoffice_cli(
+                        ["--convert-to", "pdf", "--outdir", warm_dir, str(WARMUP_FILE)], timeout=remaining
+                    )
+        except Exception:
+            # 예열 실패는 무시 (첫 요청에서 평소처럼 초기화됨)
+            pass
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    """서버 시작을 막지 않도록 예열 변환은 백그라운드에서 실행"""
+    global _WARMUP_TASK
+    _WARMUP_TASK = asyncio.create_task(warm_up_converter())
+
+
+@app.on_event("shutdown")
+async def stop_office():
+    """상주 LibreOffice 워커 및 CLI 배치 작업 종료"""
+    if _WARMUP_TASK is not None and not _WARMUP_TASK.done():
+        _WARMUP_TASK.cancel()
+        await asyncio.gather(_WARMUP_TASK, return_exceptions=True)
+    await asyncio.gather(*(worker.stop() for worker in _OFFICE_WORKERS))
+    await _CLI_BATCHER.close()
+
+
+@app.on_event("shutdown")
+async def flush_pending_writes():
+    """종료 전 남은 메타데이터 기록 완료 대기"""
+    if _PENDING_WRITES:
+        await asyncio.gather(*_PENDING_WRITES.values(), return_exceptions=True)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """HTML 페이지 반환"""
@@ -188,34 +1384,24 @@ async def root():
 @app.get("/health")
 async def health_check():
     """헬스 체크 엔드포인트"""
-    try:
-        # LibreOffice 설치 확인
-        result = subprocess.run(
-            ["libreoffice", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        libreoffice_available = result.returncode == 0
-    except Exception:
-        libreoffice_available = False
+    # LibreOffice 설치 확인
+    libreoffice_available = await _probe_libreoffice()
 
     # 폰트 시스템 확인
     try:
-        font_result = subprocess.run(
-            ["fc-list", "--format", "%{family}\n"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        font_count = len(set(font_result.stdout.strip().split('\n'))) if font_result.returncode == 0 else 0
+        fonts = await _list_fonts()
+        font_count = len(fonts) if fonts is not None else 0
     except Exception:
         font_count = 0
 
     return {
         "status": "healthy" if libreoffice_available else "degraded",
         "libreoffice_available": libreoffice_available,
-        "font_count": font_count
+        "font_count": font_count,
+        "conversion_slots": {
+            "total": CONVERT_CONCURRENCY,
+            "available": CONVERT_SEMAPHORE._value
+        }
     }
 
 
@@ -223,26 +1409,15 @@ async def health_check():
 async def list_fonts():
     """설치된 폰트 목록 조회"""
     try:
-        result = subprocess.run(
-            ["fc-list", "--format", "%{family}\\n"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        payload = await _fonts_response_json()
         
-        if result.returncode != 0:
+        if payload is None:
             raise HTTPException(
                 status_code=500,
                 detail="폰트 목록 조회 실패"
             )
         
-        fonts = sorted(set(result.stdout.strip().split('\n')))
-        fonts = [f for f in fonts if f]  # 빈 문자열 제거
-        
-        return {
-            "total_count": len(fonts),
-            "fonts": fonts
-        }
+        return Response(content=payload, media_type="application/json")
     except subprocess.TimeoutExpired:
         raise HTTPException(
             status_code=500,
@@ -255,34 +1430,89 @@ async def list_fonts():
         )
 
 
+# 관리자 API 토큰 (설정하지 않으면 관리자 API 는 서버 로컬(loopback) 요청만 허용)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_admin(request: Request, x_admin_token: Optional[str] = Header(default=None)):
+    """/admin 경로 접근 확인 (X-Admin-Token 헤더 또는 loopback 요청)"""
+    if ADMIN_TOKEN:
+        if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+            raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+        return
+    if request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="관리자 API 는 서버 로컬에서만 호출할 수 있습니다.")
+
+
+@app.post("/admin/reload-fonts", dependencies=[Depends(require_admin)])
+async def reload_fonts():
+    """폰트 목록 캐시를 비우고 다시 조회 (폰트 추가 후 사용)"""
+    _PROBE_CACHE.pop("fonts", None)
+
+    fonts = await _list_fonts()
+    if fonts is None:
+        raise HTTPException(status_code=500, detail="폰트 목록 조회 실패")
+
+    return {
+        "message": "폰트 목록을 다시 불러왔습니다.",
+        "total_count": len(fonts)
+    }
+
+
+def collect_outputs() -> List[dict]:
+    """변환된 파일 목록 생성 (디렉토리 스캔이 이벤트 루프를 막지 않도록 스레드풀에서 실행)"""
+    files = []
+    seen_keys = set()
+    # DirEntry 는 getdents 결과의 파일 타입을 재사용하므로 추가 stat 이 없음
+    for entry in scan_files(OUTPUT_DIR):
+        file_stat = entry.stat()
+        name = entry.name
+
+        metadata = get_metadata_for_output(name)
+        original_filename = metadata.get("original_filename", name) if metadata else name
+
+        # 한국 시간으로 변환 (변경되지 않은 파일은 캐시된 문자열 재사용)
+        time_key = (name, file_stat.st_mtime_ns)
+        seen_keys.add(time_key)
+        formatted = _TIME_FMT_CACHE.get(time_key)
+        if formatted is None:
+            modified_time_kst = datetime.fromtimestamp(file_stat.st_mtime, tz=KST)
+            formatted = (
+                modified_time_kst.isoformat(),
+                modified_time_kst.strftime("%Y-%m-%d %H:%M:%S")
+            )
+            with _TIME_FMT_LOCK:
+                _TIME_FMT_CACHE[time_key] = formatted
+
+        files.append({
+            "filename": name,
+            "original_filename": original_filename,
+            "size": file_stat.st_size,
+            "modified": formatted[0],
+            "modified_formatted": formatted[1],
+            "download_url": f"/download/{name}",
+            "_mtime_ns": file_stat.st_mtime_ns
+        })
+
+    # 삭제/수정된 파일의 캐시 항목 정리
+    with _TIME_FMT_LOCK:
+        for stale_key in _TIME_FMT_CACHE.keys() - seen_keys:
+            del _TIME_FMT_CACHE[stale_key]
+
+    # 수정 시간 기준 내림차순 정렬 (최신 파일 먼저, 문자열 대신 정수 비교)
+    files.sort(key=operator.itemgetter("_mtime_ns"), reverse=True)
+    for file_info in files:
+        del file_info["_mtime_ns"]
+
+    return files
+
+
 @app.get("/outputs")
 async def list_outputs():
     """변환된 파일 목록 조회"""
     try:
-        metadata_by_output, metadata_by_id = load_metadata_index()
-        files = []
-        if OUTPUT_DIR.exists():
-            for file_path in OUTPUT_DIR.iterdir():
-                if file_path.is_file():
-                    stat = file_path.stat()
-                    
-                    metadata = metadata_by_output.get(file_path.name) or metadata_by_id.get(file_path.stem)
-                    original_filename = metadata.get("original_filename", file_path.name) if metadata else file_path.name
-
-                    # 한국 시간으로 변환
-                    modified_time_kst = datetime.fromtimestamp(stat.st_mtime, tz=pytz.UTC).astimezone(KST)
-                    
-                    files.append({
-                        "filename": file_path.name,
-                        "original_filename": original_filename,
-                        "size": stat.st_size,
-                        "modified": modified_time_kst.isoformat(),
-                        "modified_formatted": modified_time_kst.strftime("%Y-%m-%d %H:%M:%S"),
-                        "download_url": f"/download/{file_path.name}"
-                    })
-        
-        # 수정 시간 기준 내림차순 정렬 (최신 파일 먼저)
-        files.sort(key=lambda x: x["modified"], reverse=True)
+        files = await run_in_threadpool(collect_outputs)
         
         return {
             "total_count": len(files),
@@ -295,31 +1525,31 @@ async def list_outputs():
         )
 
 
-@app.get("/download/{filename}")
-async def download_file(filename: str):
-    """변환된 파일 다운로드"""
+@app.api_route("/download/{filename}", methods=["GET", "HEAD"])
+async def download_file(filename: str, request: Request):
+    """변환된 파일 다운로드 (HEAD, 단일 Range 요청 지원)"""
     try:
-        file_path = OUTPUT_DIR / filename
-        
-        # 보안: 경로 탐색 공격 방지
-        if not file_path.exists() or not file_path.is_file():
-            raise HTTPException(
-                status_code=404,
-                detail="파일을 찾을 수 없습니다."
-            )
-        
-        # 상위 디렉토리로 이동 시도 방지
-        if not str(file_path.resolve()).startswith(str(OUTPUT_DIR.resolve())):
-            raise HTTPException(
-                status_code=403,
-                detail="접근이 거부되었습니다."
-            )
-        
-        return FileResponse(
-            path=str(file_path),
+        # 보안: 파일명 검증 + stat 한 번으로 존재 여부/일반 파일 여부 확인
+        file_path, file_stat = _output_file(filename)
+
+        response = RangeFileResponse(
+            path=file_path,
+            stat_result=file_stat,
             filename=filename,
-            media_type="application/octet-stream"
+            media_type="application/octet-stream",
+            headers=DOWNLOAD_CACHE_HEADERS,
+            method=request.method,
+            content_disposition_type="attachment"
         )
+
+        # If-Range 가 현재 ETag/수정 시각과 다르면 파일이 바뀐 것이므로 전체 전송
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and if_range in (None, response.headers["etag"], response.headers["last-modified"]):
+            byte_range = _parse_byte_range(range_header, file_stat.st_size)
+            if byte_range is not None:
+                response.set_byte_range(byte_range)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -332,20 +1562,14 @@ async def download_file(filename: str):
 @app.delete("/outputs/{filename}")
 async def delete_output(filename: str):
     """변환된 파일 삭제"""
-    file_path = OUTPUT_DIR / filename
-
-    if not file_path.exists() or not file_path.is_file():
-        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
-
-    if not str(file_path.resolve()).startswith(str(OUTPUT_DIR.resolve())):
-        raise HTTPException(status_code=403, detail="접근이 거부되었습니다.")
+    file_path, _ = _output_file(filename)
 
     try:
         file_path.unlink()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"파일 삭제 중 오류: {str(e)}")
 
-    metadata_removed = delete_metadata_for_output(filename)
+    metadata_removed = await delete_metadata_for_output(filename)
 
     return {
         "message": "파일을 삭제했습니다.",
@@ -354,62 +1578,78 @@ async def delete_output(filename: str):
     }
 
 
-@app.get("/conversion-options")
-async def get_conversion_options():
-    """사용 가능한 변환 옵션 조회"""
+@app.get("/metrics")
+async def get_metrics():
+    """메타데이터 캐시 적중/미스 통계"""
     return {
-        "pdf_quality_presets": PDF_QUALITY_PRESETS,
-        "options": {
-            "quality": {
-                "type": "string",
-                "default": "default",
-                "choices": list(PDF_QUALITY_PRESETS.keys()),
-                "description": "PDF 품질 프리셋"
-            },
-            "embed_fonts": {
-                "type": "boolean",
-                "default": True,
-                "description": "폰트 임베딩 (True: 폰트 포함, False: 폰트 미포함)"
-            },
-            "compress_images": {
-                "type": "boolean",
-                "default": True,
-                "description": "이미지 압축 여부"
-            },
-            "image_quality": {
-                "type": "integer",
-                "default": 90,
-                "range": [1, 100],
-                "description": "이미지 품질 (1-100)"
-            },
-            "export_notes": {
-                "type": "boolean",
-                "default": False,
-                "description": "발표자 노트 포함 여부"
-            },
-            "export_hidden_slides": {
-                "type": "boolean",
-                "default": False,
-                "description": "숨겨진 슬라이드 포함 여부"
-            },
-            "use_tagged_pdf": {
-                "type": "boolean",
-                "default": True,
-                "description": "태그된 PDF 생성 (텍스트 추출 및 접근성 향상)"
-            },
-            "export_bookmarks": {
-                "type": "boolean",
-                "default": False,
-                "description": "북마크 내보내기"
-            },
-            "pdf_version": {
-                "type": "string",
-                "default": "1.7",
-                "choices": ["1.4", "1.5", "1.6", "1.7", "2.0"],
-                "description": "PDF 버전"
-            }
+        "metadata_cache": {
+            "by_output": _BY_OUTPUT.stats(),
+            "by_id": _BY_ID.stats(),
+            "no_metadata": _NO_METADATA.stats()
+        }
+    }
+
+
+# /conversion-options 응답 (정적 내용이므로 한 번만 직렬화)
+CONVERSION_OPTIONS_JSON = orjson.dumps({
+    "pdf_quality_presets": PDF_QUALITY_PRESETS,
+    "options": {
+        "quality": {
+            "type": "string",
+            "default": "default",
+            "choices": list(PDF_QUALITY_PRESETS.keys()),
+            "description": "PDF 품질 프리셋"
+        },
+        "embed_fonts": {
+            "type": "boolean",
+            "default": True,
+            "description": "폰트 임베딩 (True: 폰트 포함, False: 폰트 미포함)"
+        },
+        "compress_images": {
+            "type": "boolean",
+            "default": True,
+            "description": "이미지 압축 여부"
+        },
+        "image_quality": {
+            "type": "integer",
+            "default": 90,
+            "range": [1, 100],
+            "description": "이미지 품질 (1-100)"
+        },
+        "export_notes": {
+            "type": "boolean",
+            "default": False,
+            "description": "발표자 노트 포함 여부"
+        },
+        "export_hidden_slides": {
+            "type": "boolean",
+            "default": False,
+            "description": "숨겨진 슬라이드 포함 여부"
+        },
+        "use_tagged_pdf": {
+            "type": "boolean",
+            "default": True,
+            "description": "태그된 PDF 생성 (텍스트 추출 및 접근성 향상)"
+        },
+        "export_bookmarks": {
+            "type": "boolean",
+            "default": False,
+            "description": "북마크 내보내기"
+        },
+        "pdf_version": {
+            "type": "string",
+            "default": "1.7",
+            "choices": ["1.4", "1.5", "1.6", "1.7", "2.0"],
+            "description": "PDF 버전"
         }
     }
+})
+
+
+@app.get("/conversion-options")
+async def get_conversion_options():
+    """사용 가능한 변환 옵션 조회"""
+    return Response(content=CONVERSION_OPTIONS_JSON, media_type="application/json")
 
 
 @app.post("/convert")
@@ -432,82 +1672,70 @@ async def convert_ppt(
     if file_ext not in ALLOWED_INPUT_FORMATS:
         raise HTTPException(
             status_code=400,
-            detail=f"지원하지 않는 입력 형식입니다. 허용된 형식: {', '.join(ALLOWED_INPUT_FORMATS)}"
+            detail=f"지원하지 않는 입력 형식입니다. 허용된 형식: {_ALLOWED_IN_MSG}"
         )
 
     # 출력 형식 검증
-    if output_format not in [fmt.lstrip(".") for fmt in ALLOWED_OUTPUT_FORMATS]:
+    if output_format not in _ALLOWED_OUT:
         raise HTTPException(
             status_code=400,
-            detail=f"지원하지 않는 출력 형식입니다. 허용된 형식: {', '.join([fmt.lstrip('.') for fmt in ALLOWED_OUTPUT_FORMATS])}"
+            detail=f"지원하지 않는 출력 형식입니다. 허용된 형식: {_ALLOWED_OUT_MSG}"
         )
 
     # 고유한 파일명 생성
     file_id = str(uuid.uuid4())
-    input_file = UPLOAD_DIR / f"{file_id}{file_ext}"
+    input_file = upload_dir_for(file.size) / f"{file_id}{file_ext}"
     output_file = OUTPUT_DIR / f"{file_id}.{output_format}"
 
     try:
+        # 같은 내용/옵션/폰트 구성으로 이미 변환한 결과가 있으면 재변환 없이 반환
+        # (폰트 목록을 조회하지 못하면 재사용하지 않음)
+        conversion_options = {"use_tagged_pdf": use_tagged_pdf}
+        content_hash = await run_in_threadpool(hash_upload, file.file)
+        font_set = await _font_set_id()
+        cached = None
+        if font_set is not None:
+            cached = find_cached_conversion(
+                conversion_cache_key(content_hash, output_format, conversion_options, font_set)
+            )
+        if cached is not None:
+            cached_path, cached_stat = cached
+            return FileResponse(
+                path=cached_path,
+                stat_result=cached_stat,
+                filename=f"{Path(file.filename).stem}.{output_format}",
+                media_type="application/octet-stream",
+                content_disposition_type="attachment"
+            )
+
         # 파일 저장
-        with open(input_file, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+        await run_in_threadpool(save_upload, file.file, input_file)
 
         # LibreOffice 변환 옵션 구성
-        convert_options = []
-        
+        # 참고: LibreOffice headless 모드에서는 많은 옵션이 제대로 작동하지 않음
+        filter_options = []
+
         if output_format == "pdf":
-            # PDF 필터 옵션 구성
-            # 참고: LibreOffice headless 모드에서는 많은 옵션이 제대로 작동하지 않음
-            filter_options = []
-            
             # 태그된 PDF (텍스트 추출 향상) - 작동 확인됨
             if use_tagged_pdf:
                 filter_options.append("UseTaggedPDF=true")
-            
-            # 필터 옵션 조합
-            if filter_options:
-                filter_data = ":".join(filter_options)
-                # PPT/Impress 파일은 impress_pdf_Export 필터 사용
-                convert_format = f"pdf:impress_pdf_Export:{{{filter_data}}}"
-            else:
-                convert_format = "pdf"
-        else:
-            convert_format = output_format
-
-        # LibreOffice 변환 명령어
-        convert_cmd = [
-            "libreoffice",
-            "--headless",
-            "--convert-to", convert_format,
-            "--outdir", str(OUTPUT_DIR),
-            str(input_file)
-        ]
-
-        result = subprocess.run(
-            convert_cmd,
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
+
+        result = await run_conversion(input_file, output_format, filter_options, timeout=120)
 
         if result.returncode != 0:
             raise HTTPException(
                 status_code=500,
-                detail=f"변환 실패: {result.stderr}"
+                detail=f"변환 실패: {result.stderr.decode('utf-8', errors='replace')}"
             )
 
-        # 변환된 파일 확인
-        if not output_file.exists():
-            # LibreOffice는 원본 파일명을 기반으로 출력 파일명을 생성할 수 있음
-            base_name = input_file.stem
-            possible_output = OUTPUT_DIR / f"{base_name}.{output_format}"
-            if possible_output.exists():
-                output_file = possible_output
-            else:
-                raise HTTPException(
-                    status_code=500,
-                    detail="변환된 파일을 찾을 수 없습니다."
-                )
+        # 변환된 파일 확인 (출력 파일명은 업로드 파일명과 같은 file_id 기준으로 고정)
+        try:
+            output_stat = output_file.stat()
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=500,
+                detail="변환된 파일을 찾을 수 없습니다."
+            )
 
         # 원본 파일명 메타데이터 저장
         metadata_file = METADATA_DIR / f"{output_file.name}.json"
@@ -516,19 +1744,20 @@ async def convert_ppt(
             "output_filename": output_file.name,
             "file_id": file_id,
             "output_format": output_format,
-            "conversion_options": {
-                "use_tagged_pdf": use_tagged_pdf
-            },
+            "conversion_options": conversion_options,
+            "content_hash": content_hash,
+            "font_set": font_set,
             "created_at": datetime.now(KST).isoformat()
         }
-        with open(metadata_file, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        save_metadata(metadata_file, metadata)
 
         # 변환된 파일 반환
         return FileResponse(
-            path=str(output_file),
+            path=output_file,
+            stat_result=output_stat,
             filename=f"{Path(file.filename).stem}.{output_format}",
-            media_type="application/octet-stream"
+            media_type="application/octet-stream",
+            content_disposition_type="attachment"
         )
 
     except subprocess.TimeoutExpired:
@@ -542,9 +1771,8 @@ async def convert_ppt(
             detail=f"변환 중 오류 발생: {str(e)}"
         )
     finally:
-        # 임시 파일 정리
-        if input_file.exists():
-            input_file.unlink()
+        # 임시 파일 정리 (캐시 적중 등으로 저장하지 않았으면 없을 수 있음)
+        input_file.unlink(missing_ok=True)
 
 
 
@@ -564,61 +1792,62 @@ async def convert_ppt_default(
     if file_ext not in ALLOWED_INPUT_FORMATS:
         raise HTTPException(
             status_code=400,
-            detail=f"지원하지 않는 입력 형식입니다. 허용된 형식: {', '.join(ALLOWED_INPUT_FORMATS)}"
+            detail=f"지원하지 않는 입력 형식입니다. 허용된 형식: {_ALLOWED_IN_MSG}"
         )
 
     # 출력 형식 검증
-    if output_format not in [fmt.lstrip(".") for fmt in ALLOWED_OUTPUT_FORMATS]:
+    if output_format not in _ALLOWED_OUT:
         raise HTTPException(
             status_code=400,
-            detail=f"지원하지 않는 출력 형식입니다. 허용된 형식: {', '.join([fmt.lstrip('.') for fmt in ALLOWED_OUTPUT_FORMATS])}"
+            detail=f"지원하지 않는 출력 형식입니다. 허용된 형식: {_ALLOWED_OUT_MSG}"
         )
 
     # 고유한 파일명 생성
     file_id = str(uuid.uuid4())
-    input_file = UPLOAD_DIR / f"{file_id}{file_ext}"
+    input_file = upload_dir_for(file.size) / f"{file_id}{file_ext}"
     output_file = OUTPUT_DIR / f"{file_id}.{output_format}"
 
     try:
+        # 같은 내용/옵션/폰트 구성으로 이미 변환한 결과가 있으면 재변환 없이 반환
+        # (폰트 목록을 조회하지 못하면 재사용하지 않음)
+        conversion_options = {}
+        content_hash = await run_in_threadpool(hash_upload, file.file)
+        font_set = await _font_set_id()
+        cached = None
+        if font_set is not None:
+            cached = find_cached_conversion(
+                conversion_cache_key(content_hash, output_format, conversion_options, font_set)
+            )
+        if cached is not None:
+            cached_path, cached_stat = cached
+            return FileResponse(
+                path=cached_path,
+                stat_result=cached_stat,
+                filename=f"{Path(file.filename).stem}.{output_format}",
+                media_type="application/octet-stream",
+                content_disposition_type="attachment"
+            )
+
         # 파일 저장
-        with open(input_file, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+        await run_in_threadpool(save_upload, file.file, input_file)
 
         # LibreOffice를 사용한 변환
-        # headless 모드로 실행하여 GUI 없이 변환
-        convert_cmd = [
-            "libreoffice",
-            "--headless",
-            "--convert-to", output_format,
-            "--outdir", str(OUTPUT_DIR),
-            str(input_file)
-        ]
-
-        result = subprocess.run(
-            convert_cmd,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
+        result = await run_conversion(input_file, output_format, timeout=60)
 
         if result.returncode != 0:
             raise HTTPException(
                 status_code=500,
-                detail=f"변환 실패: {result.stderr}"
+                detail=f"변환 실패: {result.stderr.decode('utf-8', errors='replace')}"
             )
 
-        # 변환된 파일 확인
-        if not output_file.exists():
-            # LibreOffice는 원본 파일명을 기반으로 출력 파일명을 생성할 수 있음
-            base_name = input_file.stem
-            possible_output = OUTPUT_DIR / f"{base_name}.{output_format}"
-            if possible_output.exists():
-                output_file = possible_output
-            else:
-                raise HTTPException(
-                    status_code=500,
-                    detail="변환된 파일을 찾을 수 없습니다."
-                )
+        # 변환된 파일 확인 (출력 파일명은 업로드 파일명과 같은 file_id 기준으로 고정)
+        try:
+            output_stat = output_file.stat()
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=500,
+                detail="변환된 파일을 찾을 수 없습니다."
+            )
 
         # 원본 파일명 메타데이터 저장
         metadata_file = METADATA_DIR / f"{output_file.name}.json"
@@ -627,16 +1856,19 @@ async def convert_ppt_default(
             "output_filename": output_file.name,
             "file_id": file_id,
             "output_format": output_format,
+            "content_hash": content_hash,
+            "font_set": font_set,
             "created_at": datetime.now(KST).isoformat()
         }
-        with open(metadata_file, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        save_metadata(metadata_file, metadata)
 
         # 변환된 파일 반환
         return FileResponse(
-            path=str(output_file),
+            path=output_file,
+            stat_result=output_stat,
             filename=f"{Path(file.filename).stem}.{output_format}",
-            media_type="application/octet-stream"
+            media_type="application/octet-stream",
+            content_disposition_type="attachment"
         )
 
     except subprocess.TimeoutExpired:
@@ -650,9 +1882,8 @@ async def convert_ppt_default(
             detail=f"변환 중 오류 발생: {str(e)}"
         )
     finally:
-        # 임시 파일 정리
-        if input_file.exists():
-            input_file.unlink()
+        # 임시 파일 정리 (캐시 적중 등으로 저장하지 않았으면 없을 수 있음)
+        input_file.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":